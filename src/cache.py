@@ -0,0 +1,56 @@
+import os
+from memory import recording_cache_mb
+
+
+class RecordingCache:
+    """
+    Cache em memória (gravações lidas, máscaras de qualidade etc.), limitado
+    pelo tamanho total (em bytes) dos valores armazenados.
+
+    Quando cheio, o cache deixa de admitir novas entradas em vez de descartar
+    as antigas: as etapas percorrem os arquivos na mesma ordem, e o descarte
+    da entrada menos recente removeria cada arquivo logo antes de ser pedido.
+
+    As entradas são identificadas pelo caminho do arquivo e por sua data de
+    modificação e tamanho, de modo que arquivos regravados não são reutilizados.
+    """
+
+    def __init__(self, max_mb):
+        self.max_bytes = int((max_mb or 0) * 1024**2)
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+
+    @staticmethod
+    def file_key(file_path, *extra):
+        """Monta a chave de um arquivo (caminho, mtime e tamanho)."""
+        stat = os.stat(file_path)
+        return (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size, *extra)
+
+    def get(self, key):
+        """Retorna o valor armazenado (ou None se ausente)."""
+        if key not in self._entries:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return self._entries[key][0]
+
+    def put(self, key, value, nbytes):
+        """Armazena o valor se houver espaço; caso contrário, não o armazena."""
+        previous_bytes = self._entries[key][1] if key in self._entries else 0
+        if self.current_bytes - previous_bytes + nbytes > self.max_bytes:
+            return
+
+        self._entries[key] = (value, nbytes)
+        self.current_bytes += nbytes - previous_bytes
+
+    def clear(self):
+        """Remove todas as entradas do cache."""
+        self._entries.clear()
+        self.current_bytes = 0
+
+
+# Cache compartilhado entre a análise inicial e o processamento
+recording_cache = RecordingCache(recording_cache_mb())
@@ -0,0 +1,258 @@
+import logging
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from config import (
+    N_RESAMPLES,
+    RESAMPLE_CHUNK_SIZE,
+    CONFIDENCE_LEVEL,
+    COMPARISON_WORKERS,
+    RANDOM_SEED,
+)
+from logging_config import get_log_queue, setup_worker_logging
+from memory import max_resample_chunk, measure_peak, record_children_peak
+
+
+def _permutation_blocks(pooled, n_control, blocks, chunk_size):
+    """
+    Gera as diferenças de médias (teste - controle) para rótulos permutados.
+
+    As permutações são montadas como uma matriz de índices (reamostragens x
+    arquivos). Cada bloco de reamostragens tem sua própria semente e é
+    processado em partes de até `chunk_size` linhas.
+    """
+    n_total = len(pooled)
+    n_test = n_total - n_control
+    differences = []
+
+    for size, seed in blocks:
+        rng = np.random.default_rng(seed)
+        for start in range(0, size, chunk_size):
+            rows = min(chunk_size, size - start)
+            indices = np.argsort(rng.random((rows, n_total)), axis=1)
+            resampled = pooled[indices]
+            control_mean = resampled[:, :n_control].mean(axis=1)
+            test_mean = resampled[:, n_control:].sum(axis=1) / n_test
+            differences.append(test_mean - control_mean)
+
+    return np.concatenate(differences)
+
+
+def _bootstrap_blocks(control, test, blocks, chunk_size):
+    """
+    Gera as diferenças de médias (teste - controle) de reamostragens bootstrap,
+    sorteando os índices de cada grupo com reposição, bloco a bloco.
+    """
+    differences = []
+
+    for size, seed in blocks:
+        rng = np.random.default_rng(seed)
+        for start in range(0, size, chunk_size):
+            rows = min(chunk_size, size - start)
+            # Uma única matriz de rng.random por parte (controle | teste), cuja
+            # sequência não depende de como o bloco é dividido em partes
+            draws = rng.random((rows, len(control) + len(test)))
+            control_idx = (draws[:, : len(control)] * len(control)).astype(int)
+            test_idx = (draws[:, len(control) :] * len(test)).astype(int)
+            differences.append(
+                test[test_idx].mean(axis=1) - control[control_idx].mean(axis=1)
+            )
+
+    return np.concatenate(differences)
+
+
+def _run_resampling(function, data, n_resamples, block_size, chunk_size, workers, seed):
+    """
+    Divide as reamostragens em blocos de `block_size`, cada um com uma semente
+    derivada de `seed` (SeedSequence) pelo seu índice, e executa `function`
+    distribuindo blocos contíguos entre processos quando `workers` > 1. Assim,
+    o resultado não depende do número de processos nem do tamanho das partes.
+    """
+    sizes = [
+        min(block_size, n_resamples - start)
+        for start in range(0, n_resamples, block_size)
+    ]
+    blocks = list(zip(sizes, seed.spawn(len(sizes))))
+
+    if not workers or workers <= 1:
+        return function(*data, blocks, chunk_size)
+
+    groups = np.array_split(np.arange(len(blocks)), workers)
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=setup_worker_logging,
+        initargs=(get_log_queue(),),
+    ) as executor:
+        futures = [
+            executor.submit(
+                measure_peak, function, *data, [blocks[i] for i in group], chunk_size
+            )
+            for group in groups
+            if len(group)
+        ]
+        differences = []
+        for future in futures:
+            result, peak = future.result()
+            record_children_peak(peak)
+            differences.append(result)
+        return np.concatenate(differences)
+
+
+def compare_groups(
+    control,
+    test,
+    n_resamples=N_RESAMPLES,
+    chunk_size=RESAMPLE_CHUNK_SIZE,
+    confidence_level=CONFIDENCE_LEVEL,
+    workers=COMPARISON_WORKERS,
+    seed=RANDOM_SEED,
+):
+    """
+    Compara as médias de dois grupos por teste de permutação (bicaudal) e
+    intervalo de confiança bootstrap (percentil) da diferença.
+
+    Args:
+        control (array): Valores do grupo de controle.
+        test (array): Valores do grupo de teste.
+        n_resamples (int): Número de reamostragens de cada procedimento.
+        chunk_size (int): Reamostragens por bloco; cada bloco tem sua semente e
+            é processado em partes limitadas pelo orçamento de memória.
+        confidence_level (float): Nível de confiança do intervalo.
+        workers (int): Número de processos (1 executa no processo atual).
+        seed (int): Semente do gerador de números aleatórios.
+
+    Returns:
+        dict: Médias, diferença, p-valor e limites do intervalo de confiança.
+    """
+    control = np.asarray(control, dtype=float)
+    test = np.asarray(test, dtype=float)
+    control = control[np.isfinite(control)]
+    test = test[np.isfinite(test)]
+
+    if len(control) < 2 or len(test) < 2:
+        logging.warning("Amostras insuficientes para a comparação entre os grupos")
+        return None
+
+    permutation_seed, bootstrap_seed = np.random.SeedSequence(seed).spawn(2)
+    observed = test.mean() - control.mean()
+
+    pooled = np.concatenate([control, test])
+    rows = max_resample_chunk(chunk_size, len(pooled), workers)
+    permuted = _run_resampling(
+        _permutation_blocks,
+        (pooled, len(control)),
+        n_resamples,
+        chunk_size,
+        rows,
+        workers,
+        permutation_seed,
+    )
+    # Tolerância relativa para empates numéricos com a estatística observada
+    extreme = np.abs(permuted) >= np.abs(observed) * (1 - 1e-12)
+    p_value = (np.sum(extreme) + 1) / (n_resamples + 1)
+
+    bootstrapped = _run_resampling(
+        _bootstrap_blocks,
+        (control, test),
+        n_resamples,
+        chunk_size,
+        rows,
+        workers,
+        bootstrap_seed,
+    )
+    alpha = 1 - confidence_level
+    ci_low, ci_high = np.quantile(bootstrapped, [alpha / 2, 1 - alpha / 2])
+
+    return {
+        "control_mean": control.mean(),
+        "test_mean": test.mean(),
+        "difference": observed,
+        "p_value": p_value,
+        "ci_low": ci_low,
+        "ci_high": ci_high,
+        "n_resamples": n_resamples,
+    }
+
+
+def compare_file_stats(
+    control_file_stats, test_file_stats, metrics=None, n_resamples=N_RESAMPLES
+):
+    """
+    Compara os grupos para cada métrica presente nas estatísticas por arquivo.
+
+    Args:
+        control_file_stats (dict): Métricas por arquivo do grupo de controle.
+        test_file_stats (dict): Métricas por arquivo do grupo de teste.
+        metrics (list): Métricas a comparar (padrão: todas as do controle).
+        n_resamples (int): Número de reamostragens de cada procedimento.
+
+    Returns:
+        dict: Resultado de `compare_groups` para cada métrica.
+    """
+    if metrics is None:
+        metrics = list(next(iter(control_file_stats.values()), {}).keys())
+
+    results = {}
+    for metric in metrics:
+        control = [
+            stats.get(metric, np.nan) for stats in control_file_stats.values()
+        ]
+        test = [stats.get(metric, np.nan) for stats in test_file_stats.values()]
+        logging.debug("Comparando os grupos para a métrica '%s'", metric)
+        results[metric] = compare_groups(control, test, n_resamples=n_resamples)
+
+    return results
+
+
+def generate_comparison_report(
+    control_file_stats,
+    test_file_stats,
+    output_file,
+    metrics=None,
+    n_resamples=N_RESAMPLES,
+):
+    """
+    Gera o relatório de comparação entre os grupos de controle e teste.
+
+    Args:
+        control_file_stats (dict): Métricas por arquivo do grupo de controle.
+        test_file_stats (dict): Métricas por arquivo do grupo de teste.
+        output_file (str): Arquivo para salvar o relatório.
+        metrics (list): Métricas a comparar (padrão: todas as do controle).
+        n_resamples (int): Número de reamostragens de cada procedimento.
+
+    Returns:
+        dict: Resultado da comparação para cada métrica.
+    """
+    if not control_file_stats or not test_file_stats:
+        logging.warning("Comparação não realizada — arquivos ausentes em um dos grupos.")
+        return None
+
+    results = compare_file_stats(
+        control_file_stats, test_file_stats, metrics, n_resamples
+    )
+
+    title = (
+        f"{'='*10} COMPARAÇÃO ENTRE OS GRUPOS (CONTROLE x TESTE) {'='*10}\n\n"
+        + f"Reamostragens: {n_resamples} | Nível de confiança: {CONFIDENCE_LEVEL*100:.0f}%\n\n"
+        + "Formato: Métrica | Média Controle | Média Teste | Diferença | p-valor | IC"
+    )
+    lines = [title, ""]
+    for metric, result in results.items():
+        if result is None:
+            lines.append(f"{metric} | amostras insuficientes")
+            continue
+        lines.append(
+            f"{metric} | {result['control_mean']:.3f} | {result['test_mean']:.3f} | "
+            f"{result['difference']:.3f} | {result['p_value']:.4f} | "
+            f"[{result['ci_low']:.3f}, {result['ci_high']:.3f}]"
+        )
+
+    report = "\n".join(lines)
+    logging.info(report)
+
+    with open(output_file, "w") as f:
+        f.write(report + "\n")
+
+    logging.info("Relatório salvo em: %s", output_file)
+
+    return results
@@ -26,9 +26,30 @@ TRUNCATED_OUTPUT_DIR = os.path.join(BASE_DIR, "../data/output/truncated")
 OUTLIER_THRESHOLD = 3
 MEDIAN_FILTER_KERNEL_SIZE = 5
 
+# Parâmetros dos índices não lineares
+ENTROPY_EMBEDDING_DIM = 2  # Dimensão de imersão (m) da ApEn e SampEn
+ENTROPY_TOLERANCE = 0.2  # Tolerância (r), relativa ao desvio padrão do sinal
+DFA_SHORT_RANGE = (4, 16)  # Janelas (em batimentos) para o DFA alfa 1
+DFA_LONG_RANGE = (16, 64)  # Janelas (em batimentos) para o DFA alfa 2
+NONLINEAR_WORKERS = None  # Número de processos (None usa todos os núcleos)
+
+# Parâmetros da comparação entre grupos (permutação e bootstrap)
+N_RESAMPLES = 10000  # Número de reamostragens
+RESAMPLE_CHUNK_SIZE = 1000  # Reamostragens por bloco (limita o uso de memória)
+CONFIDENCE_LEVEL = 0.95  # Nível de confiança do intervalo bootstrap
+COMPARISON_WORKERS = 1  # Número de processos (1 executa no processo atual)
+RANDOM_SEED = 42
+
+# Orçamento de memória e tipo de armazenamento dos intervalos RR
+MEMORY_BUDGET_MB = None  # Limite de memória em MB (None desativa o limite)
+RR_DTYPE = "float64"  # "float64", "float32" ou "int_ms" (milissegundos inteiros)
+RECORDING_CACHE_MB = 256  # Cache de gravações em MB (0 desativa; até 1/4 do orçamento)
+
 # Configurações de logging
 LOG_FILE = os.path.join(BASE_DIR, "../data/logs/rr_processing.log")
 LOG_LEVEL = "WARNING"  # DEBUG, INFO, WARNING, ERROR, CRITICAL
+LOG_RATE_LIMIT = 20  # Máximo de mensagens repetidas (até WARNING) por janela
+LOG_RATE_WINDOW = 60  # Duração da janela de limitação em segundos
 
 control_basename = os.path.basename(CONTROL_DIR)
 test_basename = os.path.basename(TEST_DIR)
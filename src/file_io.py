@@ -1,39 +1,118 @@
 import numpy as np
 import logging
 import os
-from config import CONTROL_DIR, TEST_DIR
+from config import CONTROL_DIR, TEST_DIR, RR_DTYPE
+from time_index import TimeIndex, get_index_path
+from memory import to_rr_dtype, from_rr_dtype
+from cache import RecordingCache, recording_cache
 
 
-def load_rr_intervals(file_path):
-    """Carrega os intervalos RR de um arquivo."""
+def load_rr_intervals(file_path, dtype=RR_DTYPE):
+    """
+    Carrega os intervalos RR (em segundos, float64) de um arquivo.
+
+    As gravações carregadas são mantidas no cache de gravações no tipo de
+    armazenamento `dtype` ("float64", "float32" ou "int_ms") e convertidas
+    de volta para float64 a cada leitura. O array retornado é somente leitura.
+    """
     try:
-        logging.debug(f"Carregando arquivo: {file_path}")
-        data = np.loadtxt(file_path, dtype=float, delimiter=" ", encoding="ISO-8859-1")
-        logging.debug(f"Arquivo carregado com sucesso: {file_path}")
+        key = RecordingCache.file_key(file_path, "rr", dtype)
+        stored = recording_cache.get(key)
+        if stored is not None:
+            logging.debug("Arquivo obtido do cache: %s", file_path)
+        else:
+            logging.debug("Carregando arquivo: %s", file_path)
+            data = np.loadtxt(
+                file_path, dtype=float, delimiter=" ", encoding="ISO-8859-1"
+            )
+            logging.debug("Arquivo carregado com sucesso: %s", file_path)
 
-        # Se os dados tiverem apenas uma coluna, retorna diretamente
-        if data.ndim == 1:  # Caso em que há apenas uma coluna
-            logging.debug(f"Arquivo possui apenas uma coluna.")
-            return data / 1000 if max(data) > 100 else data
+            # Se os dados tiverem apenas uma coluna, retorna diretamente
+            if data.ndim == 1:  # Caso em que há apenas uma coluna
+                logging.debug("Arquivo possui apenas uma coluna.")
+                rr_intervals = data / 1000 if max(data) > 100 else data
 
-        else:
-            # Se houver duas colunas, retorna apenas a segunda (intervalos RR)
-            logging.debug(f"Arquivo possui duas colunas.")
-            return data[:, 1]  # Retorna a segunda coluna (intervalos RR)
+            else:
+                # Se houver duas colunas, retorna apenas a segunda (intervalos RR)
+                logging.debug("Arquivo possui duas colunas.")
+                rr_intervals = data[:, 1].copy()
+
+            stored = to_rr_dtype(rr_intervals, dtype)
+            stored.flags.writeable = False
+            recording_cache.put(key, stored, stored.nbytes)
+
+        rr_intervals = from_rr_dtype(stored)
+        rr_intervals.flags.writeable = False
+        return rr_intervals
 
     except Exception as e:
-        logging.error(f"Erro ao carregar arquivo {file_path}: {e}")
+        logging.error("Erro ao carregar arquivo %s: %s", file_path, e)
         return None
 
 
 def save_rr_intervals(file_path, data):
     """Salva os intervalos RR processados em um arquivo."""
     try:
-        logging.debug(f"Salvando arquivo: {file_path}")
+        logging.debug("Salvando arquivo: %s", file_path)
         np.savetxt(file_path, data, fmt="%.3f")
-        logging.debug(f"Arquivo salvo com sucesso: {file_path}")
+        logging.debug("Arquivo salvo com sucesso: %s", file_path)
+    except Exception as e:
+        logging.error("Erro ao salvar arquivo %s: %s", file_path, e)
+
+
+def save_time_index(file_path, rr_intervals):
+    """
+    Salva o índice de tempo acumulado ao lado do arquivo de RRi.
+
+    O índice é construído a partir dos valores arredondados para 3 casas,
+    como gravados por `save_rr_intervals`, para coincidir com o arquivo salvo.
+    """
+    index_path = get_index_path(file_path)
+    time_index = TimeIndex.from_rr_intervals(
+        np.round(np.asarray(rr_intervals, dtype=float), 3)
+    )
+    try:
+        logging.debug("Salvando índice de tempo: %s", index_path)
+        np.save(index_path, time_index.boundaries)
+        logging.debug("Índice de tempo salvo com sucesso: %s", index_path)
     except Exception as e:
-        logging.error(f"Erro ao salvar arquivo {file_path}: {e}")
+        logging.error("Erro ao salvar índice de tempo %s: %s", index_path, e)
+    return time_index
+
+
+def load_time_index(file_path, rr_intervals=None):
+    """
+    Carrega o índice de tempo associado ao arquivo de RRi. Se não existir,
+    for mais antigo que o arquivo ou não corresponder a `rr_intervals`
+    (quando informados), o índice é reconstruído a partir dos intervalos.
+    """
+    index_path = get_index_path(file_path)
+    time_index = None
+
+    if os.path.exists(index_path):
+        if os.path.getmtime(index_path) < os.path.getmtime(file_path):
+            logging.warning("Índice de tempo desatualizado: %s", index_path)
+        else:
+            logging.debug("Carregando índice de tempo: %s", index_path)
+            time_index = TimeIndex(np.load(index_path))
+
+    if time_index is not None and rr_intervals is not None:
+        if len(time_index) != len(rr_intervals):
+            logging.warning(
+                "Índice de tempo incompatível com o arquivo (%d x %d RRi): %s",
+                len(time_index),
+                len(rr_intervals),
+                index_path,
+            )
+            time_index = None
+
+    if time_index is not None:
+        return time_index
+
+    if rr_intervals is None:
+        logging.warning("Índice de tempo não encontrado: %s", index_path)
+        return None
+    return TimeIndex.from_rr_intervals(rr_intervals)
 
 
 def save_removed_files(removed_files, param, threshold, output_dir, file_name):
@@ -41,7 +120,7 @@ def save_removed_files(removed_files, param, threshold, output_dir, file_name):
     title = f"{'='*10} LISTA DE ARQUIVOS REMOVIDOS COM {param.upper()} INFERIOR A {threshold:.1f} {'='*10}\n\n"
 
     output_file = os.path.join(output_dir, file_name)
-    logging.debug(f"Salvando arquivo de arquivos removidos: {output_file}")
+    logging.debug("Salvando arquivo de arquivos removidos: %s", output_file)
 
     count_control = sum(CONTROL_DIR in file for file in removed_files.keys())
     count_test = sum(TEST_DIR in file for file in removed_files.keys())
@@ -57,4 +136,6 @@ def save_removed_files(removed_files, param, threshold, output_dir, file_name):
             f.write(file)
             f.write(f" | {quality:.2f}\n")
 
-    logging.debug(f"Arquivo de arquivos removidos salvo com sucesso em: {output_file}")
+    logging.debug(
+        "Arquivo de arquivos removidos salvo com sucesso em: %s", output_file
+    )
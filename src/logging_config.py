@@ -1,18 +1,169 @@
+import atexit
 import logging
-from config import LOG_FILE, LOG_LEVEL
+import multiprocessing
+import time
+from logging.handlers import QueueHandler, QueueListener
+from config import LOG_FILE, LOG_LEVEL, LOG_RATE_LIMIT, LOG_RATE_WINDOW
+
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+_log_queue = None
+_listener = None
+
+
+class TemplateQueueHandler(QueueHandler):
+    """
+    QueueHandler que preserva o template da mensagem (antes da formatação)
+    no registro enfileirado, para que o limite de repetições seja aplicado
+    por template no processo principal.
+    """
+
+    def prepare(self, record):
+        template = str(record.msg)
+        record = super().prepare(record)
+        record.template = template
+        return record
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Limita a quantidade de registros repetidos (mesmo template de mensagem)
+    até WARNING emitidos dentro de uma janela de tempo. Os registros
+    descartados são contabilizados e informados na abertura da janela seguinte
+    ou ao encerrar o logging (`flush`).
+    """
+
+    def __init__(self, limit=LOG_RATE_LIMIT, window=LOG_RATE_WINDOW):
+        super().__init__()
+        self.limit = limit
+        self.window = window
+        self._windows = {}
+
+    def filter(self, record):
+        if record.levelno > logging.WARNING or not self.limit:
+            return True
+
+        key = (record.levelno, getattr(record, "template", str(record.msg)))
+        now = time.monotonic()
+        start, count, suppressed = self._windows.get(key, (now, 0, 0))
+
+        if now - start > self.window:
+            if suppressed:
+                # A mensagem já está formatada (args=None) ao sair da fila
+                record.msg = (
+                    f"{record.getMessage()} "
+                    f"({suppressed} registro(s) semelhante(s) suprimido(s))"
+                )
+                record.args = None
+            start, count, suppressed = now, 0, 0
+
+        if count >= self.limit:
+            self._windows[key] = (start, count, suppressed + 1)
+            return False
+
+        self._windows[key] = (start, count + 1, suppressed)
+        return True
+
+    def flush(self):
+        """Retorna registros informando as contagens suprimidas pendentes."""
+        records = []
+        for (levelno, template), (_, _, suppressed) in self._windows.items():
+            if suppressed:
+                records.append(
+                    logging.makeLogRecord(
+                        {
+                            "levelno": levelno,
+                            "levelname": logging.getLevelName(levelno),
+                            "msg": f"{suppressed} registro(s) semelhante(s) "
+                            f"suprimido(s): {template}",
+                        }
+                    )
+                )
+        self._windows.clear()
+        return records
+
+
+class RateLimitedQueueListener(QueueListener):
+    """
+    QueueListener que aplica um único RateLimitFilter aos registros de todos
+    os processos antes de repassá-los aos handlers.
+    """
+
+    def __init__(self, queue, *handlers):
+        super().__init__(queue, *handlers)
+        self.rate_limit = RateLimitFilter()
+
+    def handle(self, record):
+        if self.rate_limit.filter(record):
+            super().handle(record)
+
+    def stop(self):
+        super().stop()
+        # Informa as contagens suprimidas que não tiveram registro posterior
+        for record in self.rate_limit.flush():
+            super().handle(record)
+
+
+def _configure_queue_handler(queue):
+    """Direciona o logger raiz para a fila, descartando os handlers anteriores."""
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+
+    root.addHandler(TemplateQueueHandler(queue))
+    root.setLevel(getattr(logging, LOG_LEVEL))
 
 
 def setup_logging():
-    logging.basicConfig(
-        filename=LOG_FILE,
-        filemode="a",
-        format="%(asctime)s - %(levelname)s - %(message)s",
-        level=getattr(logging, LOG_LEVEL),
-    )
+    """
+    Configura o logging com uma fila: as chamadas apenas enfileiram os
+    registros e uma thread em segundo plano os escreve no arquivo e no console.
+    """
+    global _log_queue, _listener
+
+    if _listener is not None:
+        return _listener
+
+    formatter = logging.Formatter(LOG_FORMAT)
+
+    file_handler = logging.FileHandler(LOG_FILE, mode="a")
+    file_handler.setFormatter(formatter)
 
     console = logging.StreamHandler()
-    console.setLevel(getattr(logging, LOG_LEVEL))
-    formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
     console.setFormatter(formatter)
 
-    logging.getLogger().addHandler(console)
+    # Fila de multiprocessing para receber também os registros dos workers
+    _log_queue = multiprocessing.Queue(-1)
+    _configure_queue_handler(_log_queue)
+
+    _listener = RateLimitedQueueListener(_log_queue, file_handler, console)
+    _listener.start()
+    atexit.register(stop_logging)
+
+    return _listener
+
+
+def stop_logging():
+    """
+    Esvazia a fila, informa os registros suprimidos pendentes e encerra a
+    thread de escrita dos logs.
+    """
+    global _listener
+
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def get_log_queue():
+    """Retorna a fila de logging do processo principal (None se não configurada)."""
+    return _log_queue
+
+
+def setup_worker_logging(queue):
+    """
+    Inicializador dos processos de um pool: envia os registros do worker
+    para a fila do processo principal, onde o limite de repetições é aplicado.
+    """
+    if queue is not None:
+        _configure_queue_handler(queue)
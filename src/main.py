@@ -1,16 +1,20 @@
 import os
 import logging
-import numpy as np
-from file_io import load_rr_intervals, save_rr_intervals, save_removed_files
+from file_io import (
+    load_rr_intervals,
+    save_rr_intervals,
+    save_removed_files,
+    save_time_index,
+    load_time_index,
+)
 from statistics_dir import (
     generate_statistics_report,
     generate_duration_and_quality_file_report,
 )
-from processing import (
-    get_nn_intervals,
-    evaluate_signal_quality,
-    truncate_rr_intervals,
-)
+from processing import get_nn_intervals, truncate_rr_intervals, get_signal_quality
+from cache import recording_cache
+from nonlinear import generate_nonlinear_report
+from comparison import generate_comparison_report
 from utils import list_rr_files, get_output_path, ask_user, get_relative_output_path
 from config import (
     OUTPUT_DIR,
@@ -26,12 +30,13 @@ from config import (
     MIN_LENGTH_SEG,
 )
 from logging_config import setup_logging
+from memory import track_memory, generate_memory_report
 
 
 def process_data(control_dir, test_dir, min_length_seg=None, policy="early_valid"):
 
     logging.debug(
-        f"Iniciando o processamento dos diretórios: '{control_dir}' e '{test_dir}'"
+        "Iniciando o processamento dos diretórios: '%s' e '%s'", control_dir, test_dir
     )
 
     files = []
@@ -43,42 +48,53 @@ def process_data(control_dir, test_dir, min_length_seg=None, policy="early_valid
 
     if not files:
         logging.warning(
-            f"Nenhum arquivo encontrado nos diretórios '{control_dir}' e '{test_dir}'"
+            "Nenhum arquivo encontrado nos diretórios '%s' e '%s'",
+            control_dir,
+            test_dir,
         )
         return
     removed_low_quality = {}
+    denoised_files = []
 
-    for file in files[:]:
+    for file in files:
         rr_intervals = load_rr_intervals(file)
 
         if rr_intervals is not None:
 
-            logging.info(f"Removendo os {CLIP_START_LENGHT} primeiros RRis do arquivo")
+            logging.info("Removendo os %d primeiros RRis do arquivo", CLIP_START_LENGHT)
+            # A qualidade é avaliada apenas sobre os RRis mantidos após o recorte
+            signal_quality = get_signal_quality(
+                file, rr_intervals, start=CLIP_START_LENGHT
+            )
             rr_intervals = rr_intervals[CLIP_START_LENGHT:]
 
-            signal_quality = evaluate_signal_quality(rr_intervals)
             if signal_quality < QUALITY_THRESHOLD:
-                files.remove(file)
                 # Salva o nome do arquivo e a qualidade no dicionário
                 removed_low_quality[file] = round(signal_quality * 100, 2)
                 logging.warning(
-                    f"Sinal com baixa qualidade ({signal_quality*100:.2f}%), removido da análise: '{file}'"
+                    "Sinal com baixa qualidade (%.2f%%), removido da análise: '%s'",
+                    signal_quality * 100,
+                    file,
                 )
             else:
                 logging.info(
-                    f"Sinal com boa qualidade ({signal_quality*100:.2f}%), mantido na análise: '{file}'"
+                    "Sinal com boa qualidade (%.2f%%), mantido na análise: '%s'",
+                    signal_quality * 100,
+                    file,
                 )
                 rr_cleaned = get_nn_intervals(rr_intervals, LOW_RRI, HIGH_RRI)
 
-                length = np.sum(rr_cleaned)
-                if length < min_length:
-                    min_length = length
-                    min_file = file
-
                 output_file = get_output_path(
                     file, DENOISED_OUTPUT_DIR, control_dir, test_dir, "_denoised.txt"
                 )
                 save_rr_intervals(output_file, rr_cleaned)
+                time_index = save_time_index(output_file, rr_cleaned)
+                denoised_files.append(file)
+
+                length = time_index.duration
+                if length < min_length:
+                    min_length = length
+                    min_file = file
 
     save_removed_files(
         removed_low_quality,
@@ -90,33 +106,38 @@ def process_data(control_dir, test_dir, min_length_seg=None, policy="early_valid
 
     min_length_minute = round((min_length / 60), 1)
     logging.info(
-        f"O arquivo com menor duração é '{min_file}' com {min_length_minute} minutos"
+        "O arquivo com menor duração é '%s' com %s minutos",
+        min_file,
+        min_length_minute,
     )
 
     if min_length_seg:
         min_length = min_length_seg
         min_length_minute = round((min_length / 60), 1)
 
-    logging.info(f"Truncando os sinais para {min_length_minute} minutos")
+    logging.info("Truncando os sinais para %s minutos", min_length_minute)
 
     removed_low_duration = {}
-    for file in files[:]:
+    for file in denoised_files:
         denoised_file = get_output_path(
             file, DENOISED_OUTPUT_DIR, control_dir, test_dir, "_denoised.txt"
         )
 
         rr_intervals = load_rr_intervals(denoised_file)
+        time_index = load_time_index(denoised_file, rr_intervals)
 
         rr_truncated, duration_truncated = truncate_rr_intervals(
-            rr_intervals, min_length
+            rr_intervals, min_length, time_index=time_index
         )
 
         if duration_truncated < min_length:
             logging.warning(
-                f"Arquivo '{file}' removido: tempo acumulado ({(duration_truncated):.2f} s) abaixo do limite mínimo ({(min_length):.2f} s)"
+                "Arquivo '%s' removido: tempo acumulado (%.2f s) abaixo do limite mínimo (%.2f s)",
+                file,
+                duration_truncated,
+                min_length,
             )
             removed_low_duration[file] = round((duration_truncated / 60), 1)
-            files.remove(file)
         else:
             output_file = get_output_path(
                 file,
@@ -126,6 +147,7 @@ def process_data(control_dir, test_dir, min_length_seg=None, policy="early_valid
                 f"_trunc_{min_length_minute}_min.txt",
             )
             save_rr_intervals(output_file, rr_truncated)
+            save_time_index(output_file, rr_truncated)
 
     save_removed_files(
         removed_low_duration,
@@ -134,19 +156,48 @@ def process_data(control_dir, test_dir, min_length_seg=None, policy="early_valid
         OUTPUT_DIR,
         "removidos_pouca_duracao.txt",
     )
-    logging.info(f"Processo de truncamento concluído")
+    logging.info("Processo de truncamento concluído")
 
 
 def run_data_processing_and_analysis():
     logging.info("Iniciando o processamento dos dados...")
-    process_data(CONTROL_DIR, TEST_DIR, MIN_LENGTH_SEG, POLICY)
+    with track_memory("processamento"):
+        process_data(CONTROL_DIR, TEST_DIR, MIN_LENGTH_SEG, POLICY)
     logging.info("Processamento de todos os grupos concluído")
 
     trunc_control_dir = get_relative_output_path(TRUNCATED_OUTPUT_DIR, CONTROL_DIR)
     trunc_test_dir = get_relative_output_path(TRUNCATED_OUTPUT_DIR, TEST_DIR)
 
     report_file = os.path.join(OUTPUT_DIR, "relatorio_trunc.txt")
-    generate_statistics_report(trunc_control_dir, trunc_test_dir, report_file)
+    with track_memory("relatorio_truncados"):
+        statistics = generate_statistics_report(
+            trunc_control_dir, trunc_test_dir, report_file
+        )
+
+    nonlinear_report_file = os.path.join(OUTPUT_DIR, "relatorio_nao_linear.txt")
+    with track_memory("indices_nao_lineares"):
+        control_metrics, test_metrics = generate_nonlinear_report(
+            trunc_control_dir, trunc_test_dir, nonlinear_report_file
+        )
+
+    if statistics is None:
+        return
+
+    # Une duração, qualidade e índices não lineares de cada arquivo
+    _, control_file_stats, test_file_stats = statistics
+    for file_stats, files_metrics in [
+        (control_file_stats, control_metrics),
+        (test_file_stats, test_metrics),
+    ]:
+        for file, metrics in files_metrics.items():
+            file_stats.get(file, {}).update(metrics)
+
+    with track_memory("comparacao_truncados"):
+        generate_comparison_report(
+            control_file_stats,
+            test_file_stats,
+            os.path.join(OUTPUT_DIR, "relatorio_comparacao_trunc.txt"),
+        )
 
 
 def run_data_analysis(
@@ -169,6 +220,11 @@ def run_data_analysis(
             test_file_stats,
             report_file.replace(".txt", "_duracao_e_qualidade.txt"),
         )
+        generate_comparison_report(
+            control_file_stats,
+            test_file_stats,
+            report_file.replace(".txt", "_comparacao.txt"),
+        )
 
     logging.info("Análise de dados concluída com sucesso.")
 
@@ -177,12 +233,23 @@ def main():
     setup_logging()
 
     if ask_user("Deseja realizar uma análise inicial dos dados?") == "s":
-        run_data_analysis(OUTPUT_DIR, CONTROL_DIR, TEST_DIR, "relatorio_inicial.txt")
+        with track_memory("analise_inicial"):
+            run_data_analysis(
+                OUTPUT_DIR, CONTROL_DIR, TEST_DIR, "relatorio_inicial.txt"
+            )
         if ask_user("Deseja continuar com o processamento dos dados?") == "s":
             run_data_processing_and_analysis()
     else:
         run_data_processing_and_analysis()
 
+    generate_memory_report(os.path.join(OUTPUT_DIR, "relatorio_memoria.txt"))
+    logging.info(
+        "Cache de gravações: %d acerto(s), %d falha(s), %.1f MB em uso",
+        recording_cache.hits,
+        recording_cache.misses,
+        recording_cache.current_bytes / 1024**2,
+    )
+
 
 if __name__ == "__main__":
     main()
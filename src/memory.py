@@ -0,0 +1,214 @@
+import os
+import logging
+import numpy as np
+from contextlib import contextmanager
+from config import MEMORY_BUDGET_MB, RR_DTYPE, RECORDING_CACHE_MB
+
+try:
+    import resource
+except ImportError:  # Indisponível fora de sistemas Unix
+    resource = None
+
+
+RR_DTYPES = {"float64": np.float64, "float32": np.float32, "int_ms": np.int32}
+
+# Estimativas usadas para converter o orçamento em recordings simultâneos
+WORKER_OVERHEAD_BYTES = 80 * 1024**2  # Interpretador + numpy + pandas por processo
+BYTES_PER_LINE = 6  # Tamanho médio de uma linha de RRi em texto ("0.812\n")
+WORKING_COPIES = 16  # Cópias de trabalho de um sinal durante o processamento
+CACHE_BUDGET_FRACTION = 0.25  # Fração máxima do orçamento destinada ao cache
+
+# Picos de memória observados por etapa (em bytes)
+memory_peaks = {}
+
+# Maior pico informado pelos processos filhos na etapa em andamento
+_stage_children_peak = None
+
+
+def to_rr_dtype(rr_intervals, dtype=RR_DTYPE):
+    """
+    Converte os intervalos RR (em segundos) para o tipo de armazenamento.
+
+    Com "int_ms" os intervalos são mantidos como milissegundos inteiros,
+    desde que isso não perca precisão; caso contrário, mantém float64.
+    """
+    if dtype == "int_ms":
+        milliseconds = np.rint(rr_intervals * 1000)
+        if not np.allclose(milliseconds, rr_intervals * 1000, rtol=0, atol=1e-6):
+            logging.warning(
+                "Intervalos com resolução inferior a 1 ms, mantidos como float64"
+            )
+            return np.asarray(rr_intervals, dtype=np.float64)
+        return milliseconds.astype(RR_DTYPES[dtype])
+
+    return np.asarray(rr_intervals, dtype=RR_DTYPES[dtype])
+
+
+def from_rr_dtype(rr_intervals):
+    """
+    Converte os intervalos RR armazenados (em qualquer tipo de `RR_DTYPES`)
+    para float64 em segundos, o tipo usado em todos os cálculos.
+    """
+    if np.issubdtype(rr_intervals.dtype, np.integer):
+        return rr_intervals / 1000
+    if rr_intervals.dtype == np.float32:
+        # Arredonda ao microssegundo (acima do erro do float32 para RRi < 8 s),
+        # recuperando os mesmos valores em float64 de dados com resolução de ms
+        return np.round(rr_intervals.astype(np.float64), 6)
+    return rr_intervals.astype(np.float64, copy=False)
+
+
+def estimate_recording_bytes(file_path):
+    """
+    Estima a memória necessária para processar uma gravação (os cálculos
+    são sempre feitos em float64, independente do tipo de armazenamento).
+    """
+    n_beats = os.path.getsize(file_path) / BYTES_PER_LINE
+    return int(n_beats * np.dtype(np.float64).itemsize * WORKING_COPIES)
+
+
+def recording_cache_mb(budget_mb=MEMORY_BUDGET_MB):
+    """
+    Retorna o tamanho do cache de gravações em MB: RECORDING_CACHE_MB, limitado
+    a uma fração do orçamento de memória quando houver orçamento.
+    """
+    if budget_mb is None:
+        return RECORDING_CACHE_MB
+    return min(RECORDING_CACHE_MB, budget_mb * CACHE_BUDGET_FRACTION)
+
+
+def max_recordings_in_flight(files, budget_mb=MEMORY_BUDGET_MB):
+    """
+    Calcula quantas gravações podem ser processadas simultaneamente (uma por
+    processo) sem exceder o orçamento de memória, descontado o cache.
+
+    Returns:
+        int: Limite de gravações simultâneas (None se não houver orçamento).
+    """
+    if budget_mb is None or not files:
+        return None
+
+    per_recording = WORKER_OVERHEAD_BYTES + max(map(estimate_recording_bytes, files))
+    available_mb = budget_mb - recording_cache_mb(budget_mb)
+    limit = max(1, int(available_mb * 1024**2 // per_recording))
+    logging.debug(
+        "Orçamento de %d MB: até %d gravação(ões) simultânea(s)", budget_mb, limit
+    )
+    return limit
+
+
+def limit_workers(workers, files, budget_mb=MEMORY_BUDGET_MB):
+    """Reduz o número de processos de um pool ao permitido pelo orçamento."""
+    in_flight = max_recordings_in_flight(files, budget_mb)
+    if in_flight is None:
+        return workers
+    return min(workers or os.cpu_count() or 1, in_flight)
+
+
+def max_resample_chunk(chunk_size, n_columns, workers=1, budget_mb=MEMORY_BUDGET_MB):
+    """
+    Limita o número de linhas das matrizes de reamostragem ao orçamento,
+    considerando três matrizes de 8 bytes (sorteio, índices e valores).
+    """
+    if budget_mb is None:
+        return chunk_size
+
+    row_bytes = 3 * 8 * n_columns * max(1, workers or 1)
+    return max(1, min(chunk_size, int(budget_mb * 1024**2 // row_bytes)))
+
+
+def _reset_peak_rss():
+    """Zera o pico de memória residente do processo (apenas Linux)."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_bytes():
+    """Retorna o pico de memória residente do processo em bytes."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+
+    if resource is None:
+        return None
+    # ru_maxrss é informado em KB no Linux e em bytes no macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+
+def measure_peak(function, *args):
+    """
+    Executa `function` (num processo filho de um pool) e retorna também o pico
+    de memória residente do processo, a ser registrado com `record_children_peak`.
+    """
+    return function(*args), peak_rss_bytes()
+
+
+def record_children_peak(peak):
+    """Registra o pico de memória informado por um processo filho da etapa atual."""
+    global _stage_children_peak
+
+    if peak is not None:
+        _stage_children_peak = max(peak, _stage_children_peak or 0)
+
+
+@contextmanager
+def track_memory(stage):
+    """
+    Registra o pico de memória residente observado durante uma etapa.
+
+    O pico por etapa depende de /proc/self/clear_refs (Linux); nos demais
+    sistemas o valor é o pico acumulado do processo até o fim da etapa. O
+    pico dos processos filhos considera apenas os pools executados na etapa.
+    """
+    global _stage_children_peak
+
+    _reset_peak_rss()
+    _stage_children_peak = None
+    try:
+        yield
+    finally:
+        peak = peak_rss_bytes()
+        memory_peaks[stage] = (peak, _stage_children_peak)
+        if peak is not None:
+            logging.info(
+                "Pico de memória na etapa '%s': %.1f MB", stage, peak / 1024**2
+            )
+
+
+def generate_memory_report(output_file):
+    """
+    Salva o relatório com os picos de memória observados em cada etapa.
+
+    Args:
+        output_file (str): Arquivo para salvar o relatório.
+    """
+    if not memory_peaks:
+        return
+
+    lines = [
+        f"{'='*10} PICOS DE MEMÓRIA POR ETAPA {'='*10}\n",
+        f"Orçamento de memória (MB): {MEMORY_BUDGET_MB}",
+        f"Tipo dos intervalos RR: {RR_DTYPE}\n",
+        "Formato: Etapa | Processo principal (MB) | Maior processo filho (MB)",
+        "(- indica etapa sem processos filhos)\n",
+    ]
+    for stage, (peak, children_peak) in memory_peaks.items():
+        values = [
+            "n/d" if peak is None else f"{peak / 1024**2:.1f}",
+            "-" if children_peak is None else f"{children_peak / 1024**2:.1f}",
+        ]
+        lines.append(f"{stage} | {' | '.join(values)}")
+
+    with open(output_file, "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+    logging.info("Relatório salvo em: %s", output_file)
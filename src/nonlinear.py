@@ -0,0 +1,414 @@
+import os
+import logging
+import numpy as np
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor
+from config import (
+    ENTROPY_EMBEDDING_DIM,
+    ENTROPY_TOLERANCE,
+    DFA_SHORT_RANGE,
+    DFA_LONG_RANGE,
+    NONLINEAR_WORKERS,
+)
+from utils import list_rr_files
+from file_io import load_rr_intervals
+from logging_config import get_log_queue, setup_worker_logging
+from memory import limit_workers, measure_peak, record_children_peak
+
+
+NONLINEAR_METRICS = [
+    "sd1",
+    "sd2",
+    "sd_ratio",
+    "apen",
+    "sampen",
+    "dfa_alpha1",
+    "dfa_alpha2",
+]
+
+# Parâmetros da KD-tree usada na contagem de vizinhos da ApEn e SampEn
+KDTREE_LEAF_SIZE = 16  # Máximo de templates por folha
+KDTREE_QUERY_BATCH = 1024  # Consultas processadas juntas (limita a memória)
+
+
+def poincare_sd1_sd2(nn_intervals):
+    """
+    Calcula os descritores SD1 e SD2 do gráfico de Poincaré.
+
+    Args:
+        nn_intervals (array): Intervalos NN em milissegundos.
+
+    Returns:
+        tuple: (SD1, SD2) na mesma unidade dos intervalos.
+    """
+    nn_intervals = np.asarray(nn_intervals, dtype=float)
+    diff_nn = np.diff(nn_intervals)
+
+    var_diff = np.var(diff_nn, ddof=1)
+    sd1 = np.sqrt(0.5 * var_diff)
+    sd2 = np.sqrt(2 * np.var(nn_intervals, ddof=1) - 0.5 * var_diff)
+
+    return sd1, sd2
+
+
+def _embed(signal, dim):
+    """Monta a matriz de templates (vetores de atraso) de dimensão `dim`."""
+    n_templates = len(signal) - dim + 1
+    idx = np.arange(dim)[None, :] + np.arange(n_templates)[:, None]
+    return signal[idx]
+
+
+def _build_kdtree(points, leaf_size=KDTREE_LEAF_SIZE):
+    """
+    Constroi uma KD-tree implícita: os pontos são reordenados de modo que cada
+    nó corresponda a um intervalo contíguo [start, end) do array reordenado.
+
+    Returns:
+        tuple: Ordem dos pontos, início, fim e filhos de cada nó (-1 nas folhas)
+        e os limites inferior e superior dos pontos de cada nó.
+    """
+    order = np.arange(len(points))
+    starts, ends, children = [0], [len(points)], [-1]
+
+    node = 0
+    while node < len(starts):
+        start, end = starts[node], ends[node]
+        if end - start > leaf_size:
+            # Divide pela mediana da coordenada de maior amplitude
+            subset = points[order[start:end]]
+            dim = np.argmax(np.ptp(subset, axis=0))
+            half = (end - start) // 2
+            order[start:end] = order[start:end][
+                np.argpartition(subset[:, dim], half)
+            ]
+            children[node] = len(starts)
+            starts += [start, start + half]
+            ends += [start + half, end]
+            children += [-1, -1]
+        node += 1
+
+    starts, ends, children = np.array(starts), np.array(ends), np.array(children)
+    sorted_points = points[order]
+
+    # Os filhos têm índices maiores que o pai: os limites são propagados de baixo
+    low = np.empty((len(starts), points.shape[1]))
+    high = np.empty_like(low)
+    for node in range(len(starts) - 1, -1, -1):
+        left = children[node]
+        if left < 0:
+            low[node] = sorted_points[starts[node] : ends[node]].min(axis=0)
+            high[node] = sorted_points[starts[node] : ends[node]].max(axis=0)
+        else:
+            low[node] = np.minimum(low[left], low[left + 1])
+            high[node] = np.maximum(high[left], high[left + 1])
+
+    return order, starts, ends, children, low, high
+
+
+def _neighbor_counts(templates, tolerance):
+    """
+    Conta, para cada template, quantos outros estão a uma distância de
+    Chebyshev menor ou igual à tolerância (sem contar o próprio template).
+
+    A contagem é feita por busca em intervalo numa KD-tree: nós inteiramente
+    dentro da vizinhança somam seu tamanho sem comparar os pontos, e apenas
+    as folhas que cruzam a fronteira são comparadas ponto a ponto. Todas as
+    consultas de um lote percorrem a árvore juntas, nível a nível.
+    """
+    order, starts, ends, children, low, high = _build_kdtree(templates)
+    points = templates[order]
+    sizes = ends - starts
+    n_templates = len(points)
+    counts = np.zeros(n_templates)
+
+    for batch in range(0, n_templates, KDTREE_QUERY_BATCH):
+        queries = np.arange(batch, min(batch + KDTREE_QUERY_BATCH, n_templates))
+        nodes = np.zeros(len(queries), dtype=np.int64)
+
+        while len(queries):
+            q = points[queries]
+            below = low[nodes] - q
+            above = high[nodes] - q
+            # Os limites do nó majoram/minoram |p - q| de todos os seus pontos
+            far = np.any((below > tolerance) | (-above > tolerance), axis=1)
+            inside = np.all(
+                np.maximum(np.abs(below), np.abs(above)) <= tolerance, axis=1
+            )
+            counts += np.bincount(
+                queries[inside], weights=sizes[nodes[inside]], minlength=n_templates
+            )
+
+            crossing = ~far & ~inside
+            leaf = crossing & (children[nodes] < 0)
+
+            # Folhas na fronteira: compara a consulta com cada ponto da folha
+            leaf_queries, leaf_nodes = queries[leaf], nodes[leaf]
+            leaf_sizes = sizes[leaf_nodes]
+            pair_queries = np.repeat(leaf_queries, leaf_sizes)
+            offsets = np.arange(len(pair_queries)) - np.repeat(
+                np.cumsum(leaf_sizes) - leaf_sizes, leaf_sizes
+            )
+            pair_points = np.repeat(starts[leaf_nodes], leaf_sizes) + offsets
+            match = np.all(
+                np.abs(points[pair_points] - points[pair_queries]) <= tolerance,
+                axis=1,
+            )
+            counts += np.bincount(pair_queries[match], minlength=n_templates)
+
+            # Nós internos na fronteira: desce para os dois filhos
+            internal = crossing & ~leaf
+            left = children[nodes[internal]]
+            queries = np.repeat(queries[internal], 2)
+            nodes = np.column_stack((left, left + 1)).ravel()
+
+    # Remove a correspondência de cada template consigo mesmo e
+    # retorna as contagens na ordem original dos templates
+    result = np.empty(n_templates, dtype=np.int64)
+    result[order] = counts.astype(np.int64) - 1
+    return result
+
+
+def approximate_entropy(signal, m=ENTROPY_EMBEDDING_DIM, r=ENTROPY_TOLERANCE):
+    """
+    Calcula a entropia aproximada (ApEn) do sinal.
+
+    Args:
+        signal (array): Série temporal.
+        m (int): Dimensão de imersão.
+        r (float): Tolerância, relativa ao desvio padrão do sinal.
+
+    Returns:
+        float: Valor da ApEn.
+    """
+    signal = np.asarray(signal, dtype=float)
+    tolerance = r * np.std(signal)
+
+    phi = []
+    for dim in (m, m + 1):
+        templates = _embed(signal, dim)
+        # Na ApEn o próprio template é contado como correspondência
+        counts = _neighbor_counts(templates, tolerance) + 1
+        phi.append(np.mean(np.log(counts / len(templates))))
+
+    return phi[0] - phi[1]
+
+
+def sample_entropy(signal, m=ENTROPY_EMBEDDING_DIM, r=ENTROPY_TOLERANCE):
+    """
+    Calcula a entropia amostral (SampEn) do sinal.
+
+    Args:
+        signal (array): Série temporal.
+        m (int): Dimensão de imersão.
+        r (float): Tolerância, relativa ao desvio padrão do sinal.
+
+    Returns:
+        float: Valor da SampEn (infinito se não houver correspondências em m + 1).
+    """
+    signal = np.asarray(signal, dtype=float)
+    tolerance = r * np.std(signal)
+
+    # Ambas as dimensões usam os mesmos N - m templates (Richman & Moorman)
+    templates_m1 = _embed(signal, m + 1)
+    templates_m = _embed(signal, m)[: len(templates_m1)]
+
+    b = np.sum(_neighbor_counts(templates_m, tolerance))
+    a = np.sum(_neighbor_counts(templates_m1, tolerance))
+
+    if a == 0 or b == 0:
+        logging.debug("Nenhuma correspondência encontrada no cálculo da SampEn")
+        return np.inf
+
+    return -np.log(a / b)
+
+
+def _dfa_fluctuations(profile, box_sizes):
+    """
+    Calcula a flutuação F(n) para cada tamanho de janela.
+
+    O perfil é dividido em uma matriz (janelas x n) e a tendência linear de
+    cada janela é removida de forma vetorizada, com o perfil e o tempo
+    centrados na própria janela (numericamente estável em sinais longos).
+    """
+    fluctuations = np.empty(len(box_sizes))
+    for k, n in enumerate(box_sizes):
+        n_boxes = len(profile) // n
+        boxes = profile[: n_boxes * n].reshape(n_boxes, n)
+
+        t = np.arange(n) - (n - 1) / 2
+        y = boxes - boxes.mean(axis=1, keepdims=True)
+        slopes = y @ t / (t @ t)
+        residual = y - slopes[:, None] * t
+
+        fluctuations[k] = np.sqrt(np.mean(residual**2))
+
+    return fluctuations
+
+
+def detrended_fluctuation_analysis(nn_intervals, box_range):
+    """
+    Calcula o expoente de escala da DFA para um intervalo de tamanhos de janela.
+
+    Args:
+        nn_intervals (array): Intervalos NN.
+        box_range (tuple): Menor e maior tamanho de janela (em batimentos).
+
+    Returns:
+        float: Expoente de escala (alfa).
+    """
+    nn_intervals = np.asarray(nn_intervals, dtype=float)
+    low, high = box_range
+    high = min(high, len(nn_intervals) // 2)
+    if high <= low:
+        logging.warning(
+            "Sinal muito curto (%d NNi) para a DFA no intervalo %s",
+            len(nn_intervals),
+            box_range,
+        )
+        return np.nan
+
+    box_sizes = np.arange(low, high + 1)
+    profile = np.cumsum(nn_intervals - np.mean(nn_intervals))
+    fluctuations = _dfa_fluctuations(profile, box_sizes)
+
+    valid = fluctuations > 0
+    if np.sum(valid) < 2:
+        logging.warning(
+            "Flutuações nulas na DFA no intervalo %s (sinal constante?)", box_range
+        )
+        return np.nan
+
+    alpha, _ = np.polyfit(np.log(box_sizes[valid]), np.log(fluctuations[valid]), 1)
+    return alpha
+
+
+def compute_nonlinear_metrics(nn_intervals):
+    """
+    Calcula os índices não lineares da HRV.
+
+    Args:
+        nn_intervals (array): Intervalos NN em segundos.
+
+    Returns:
+        dict: SD1 e SD2 (ms), razão SD1/SD2, ApEn, SampEn, DFA α1 e α2.
+    """
+    nn_intervals = np.asarray(nn_intervals, dtype=float) * 1000
+    sd1, sd2 = poincare_sd1_sd2(nn_intervals)
+
+    return {
+        "sd1": sd1,
+        "sd2": sd2,
+        "sd_ratio": sd1 / sd2,
+        "apen": approximate_entropy(nn_intervals),
+        "sampen": sample_entropy(nn_intervals),
+        "dfa_alpha1": detrended_fluctuation_analysis(nn_intervals, DFA_SHORT_RANGE),
+        "dfa_alpha2": detrended_fluctuation_analysis(nn_intervals, DFA_LONG_RANGE),
+    }
+
+
+def _compute_file_metrics(file):
+    """Carrega um arquivo de NNi e calcula seus índices não lineares."""
+    nn_intervals = load_rr_intervals(file)
+    if nn_intervals is None:
+        return file, None
+    return file, compute_nonlinear_metrics(nn_intervals)
+
+
+def evaluate_directory_nonlinear_metrics(directory, workers=NONLINEAR_WORKERS):
+    """
+    Calcula os índices não lineares de todos os arquivos de um diretório,
+    distribuindo os arquivos entre processos.
+
+    Args:
+        directory (str): Caminho do diretório a ser avaliado.
+        workers (int): Número de processos (None usa todos os núcleos),
+            limitado pelo orçamento de memória.
+
+    Returns:
+        dict: Índices não lineares por arquivo.
+    """
+    files = list_rr_files(directory)
+    if not files:
+        logging.warning("Nenhum arquivo encontrado em %s", directory)
+        return {}
+
+    # Cada processo mantém uma gravação por vez
+    workers = limit_workers(workers, files)
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=setup_worker_logging,
+        initargs=(get_log_queue(),),
+    ) as executor:
+        results = executor.map(
+            measure_peak, repeat(_compute_file_metrics, len(files)), files
+        )
+        files_metrics = {}
+        for (file, metrics), peak in results:
+            record_children_peak(peak)
+            if metrics:
+                files_metrics[file] = metrics
+
+    return files_metrics
+
+
+def generate_group_nonlinear_report(group_files_metrics, group_name):
+    """
+    Gera as linhas do relatório de índices não lineares de um grupo.
+
+    Args:
+        group_files_metrics (dict): Índices não lineares por arquivo.
+        group_name (str): Nome do grupo (Controle ou Teste).
+
+    Returns:
+        str: Linhas formatadas para o grupo.
+    """
+    lines = [f"\n\nGRUPO: {group_name.upper()}"]
+
+    for i, (file_path, metrics) in enumerate(group_files_metrics.items(), start=1):
+        values = " | ".join(f"{metrics[name]:.3f}" for name in NONLINEAR_METRICS)
+        lines.append(f"   {i}. {os.path.basename(file_path)} | {values}")
+
+    if group_files_metrics:
+        means = " | ".join(
+            f"{np.nanmean([m[name] for m in group_files_metrics.values()]):.3f}"
+            for name in NONLINEAR_METRICS
+        )
+        lines.append(f"   Média | {means}")
+
+    return "\n".join(lines)
+
+
+def generate_nonlinear_report(control_dir, test_dir, output_file):
+    """
+    Gera o relatório de índices não lineares dos grupos.
+
+    Args:
+        control_dir (str): Caminho para o diretório de controle.
+        test_dir (str): Caminho para o diretório de teste.
+        output_file (str): Arquivo para salvar o relatório.
+
+    Returns:
+        tuple: Índices não lineares por arquivo do controle e do teste.
+    """
+    control_metrics = evaluate_directory_nonlinear_metrics(control_dir)
+    test_metrics = evaluate_directory_nonlinear_metrics(test_dir)
+
+    title = (
+        f"{'='*10} RELATÓRIO DOS ÍNDICES NÃO LINEARES {'='*10}\n\n"
+        + "Formato: X.Nome do Arquivo | SD1 (ms) | SD2 (ms) | SD1/SD2 | ApEn | SampEn | DFA α1 | DFA α2"
+    )
+    control_report = generate_group_nonlinear_report(control_metrics, "Controle")
+    test_report = generate_group_nonlinear_report(test_metrics, "Teste")
+
+    logging.info(title)
+    logging.info(control_report)
+    logging.info(test_report)
+
+    with open(output_file, "w") as f:
+        f.write(title)
+        f.write(control_report)
+        f.write(test_report + "\n")
+
+    logging.info("Relatório salvo em: %s", output_file)
+
+    return control_metrics, test_metrics
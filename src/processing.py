@@ -18,6 +18,8 @@
 import logging
 import numpy as np
 import pandas as pd
+from time_index import TimeIndex
+from cache import RecordingCache, recording_cache
 
 # from scipy.signal import medfilt
 from config import (
@@ -36,7 +38,7 @@ def detect_outliers(rr_intervals, low_rri=LOW_RRI, high_rri=HIGH_RRI):
     # Máscara booleana para detectar valores fora dos limites
     outliers_mask = ~(rr_intervals < low_rri) | (rr_intervals > high_rri)
 
-    logging.info(f"{np.sum(outliers_mask)} outlier(s) encontrado(s).")
+    logging.info("%d outlier(s) encontrado(s).", np.sum(outliers_mask))
 
     return outliers_mask
 
@@ -84,14 +86,12 @@ def remove_outliers(rr_intervals, low_rri=LOW_RRI, high_rri=HIGH_RRI):
     outliers = (rr_intervals < low_rri) | (rr_intervals > high_rri)
     rr_intervals_cleaned = np.where(outliers, np.nan, rr_intervals)
 
-    # Coleta os valores considerados outliers
-    outliers_list = rr_intervals[outliers].tolist()
-
     # Log dos resultados
     nan_count = np.sum(outliers)
-    logging.info(f"{nan_count} outlier(s) removido(s).")
-    if nan_count:
-        logging.debug(f"Outlier(s): {outliers_list}")
+    logging.info("%d outlier(s) removido(s).", nan_count)
+    if nan_count and logging.getLogger().isEnabledFor(logging.DEBUG):
+        # Coleta os valores considerados outliers apenas se forem registrados
+        logging.debug("Outlier(s): %s", rr_intervals[outliers].tolist())
 
     return rr_intervals_cleaned
 
@@ -104,7 +104,9 @@ def detect_ectopic_beats(rr_intervals, threshold=0.2):
     ectopic_beats = np.full(rr_intervals.shape, False)
     ectopic_beats[1:] = np.abs(rr_ratio - 1) > (1 + threshold)
 
-    logging.info(f"{np.sum(ectopic_beats)} batimentos(s) ectópico(s) encontrado(s).")
+    logging.info(
+        "%d batimentos(s) ectópico(s) encontrado(s).", np.sum(ectopic_beats)
+    )
 
     return ectopic_beats
 
@@ -140,26 +142,36 @@ def remove_ectopic_beats(rr_intervals, threshold=0.2):
     nn_intervals[0] = rr_intervals[0]
     nn_intervals[1:] = np.where(~ectopic_beats[1:], rr_intervals[1:], np.nan)
 
-    # Coleta os valores dos batimentos ectópicos removidos
-    removed_beats = rr_intervals[ectopic_beats].tolist()
-
     # Log dos resultados
-    outlier_count = len(removed_beats)
-    logging.info(f"{outlier_count} batimento(s) ectópico(s) removido(s).")
-    if outlier_count:
-        logging.debug(f"Batimento(s) ectópico(s) removido(s): {removed_beats}")
+    outlier_count = np.sum(ectopic_beats)
+    logging.info("%d batimento(s) ectópico(s) removido(s).", outlier_count)
+    if outlier_count and logging.getLogger().isEnabledFor(logging.DEBUG):
+        # Coleta os valores dos batimentos ectópicos apenas se forem registrados
+        logging.debug(
+            "Batimento(s) ectópico(s) removido(s): %s",
+            rr_intervals[ectopic_beats].tolist(),
+        )
 
     return nn_intervals
 
 
-# Função para avaliar a qualidade do sinal
-def evaluate_signal_quality(rr_intervals):
-    logging.debug(f"Avaliando a qualidade do sinal")
+def detect_quality_masks(rr_intervals):
+    """Retorna as máscaras de outliers e de batimentos ectópicos do sinal."""
+    return detect_outliers(rr_intervals), detect_ectopic_beats(rr_intervals)
 
-    outliers = detect_outliers(rr_intervals)
-    ectopic_beats = detect_ectopic_beats(rr_intervals)
 
-    total_beats = len(rr_intervals)
+def quality_from_masks(outliers, ectopic_beats, start=0):
+    """
+    Calcula o percentual de batimentos válidos a partir das máscaras do sinal,
+    considerando apenas os batimentos a partir de `start`. O resultado equivale
+    a avaliar o sinal recortado, cujo primeiro batimento nunca é ectópico.
+    """
+    outliers = outliers[start:]
+    ectopic_beats = ectopic_beats[start:].copy()
+    if len(ectopic_beats):
+        ectopic_beats[0] = False
+
+    total_beats = len(outliers)
     # Máscara booleana que seleciona apenas os batimentos válidos
     valid_beats = np.sum(~ectopic_beats & ~outliers)
     valid_percentage = valid_beats / total_beats
@@ -167,13 +179,50 @@ def evaluate_signal_quality(rr_intervals):
     ectopic_percentage = np.sum(ectopic_beats) / total_beats
     outlier_percentage = np.sum(outliers) / total_beats
 
-    logging.debug(f"Percentual de batimentos válidos: {valid_percentage*100:.2f}%")
-    logging.debug(f"Percentual de outliers: {outlier_percentage*100:.2f}%")
-    logging.debug(f"Percentual de batimentos ectópicos: {ectopic_percentage*100:.2f}%")
+    logging.debug("Percentual de batimentos válidos: %.2f%%", valid_percentage * 100)
+    logging.debug("Percentual de outliers: %.2f%%", outlier_percentage * 100)
+    logging.debug(
+        "Percentual de batimentos ectópicos: %.2f%%", ectopic_percentage * 100
+    )
 
     return valid_percentage
 
 
+# Função para avaliar a qualidade do sinal
+def evaluate_signal_quality(rr_intervals):
+    logging.debug("Avaliando a qualidade do sinal")
+
+    outliers, ectopic_beats = detect_quality_masks(rr_intervals)
+
+    return quality_from_masks(outliers, ectopic_beats)
+
+
+def get_signal_quality(file_path, rr_intervals, start=0):
+    """
+    Avalia a qualidade do sinal de um arquivo a partir do batimento `start`,
+    reutilizando as máscaras de qualidade já calculadas para o arquivo.
+
+    Args:
+        file_path (str): Arquivo de origem dos intervalos RR.
+        rr_intervals (array): Intervalos RR completos do arquivo, em segundos.
+        start (int): Quantidade de batimentos iniciais desconsiderados.
+
+    Returns:
+        float: Percentual de batimentos válidos.
+    """
+    key = RecordingCache.file_key(file_path, "quality")
+    masks = recording_cache.get(key)
+
+    if masks is None:
+        logging.debug("Avaliando a qualidade do sinal: %s", file_path)
+        masks = detect_quality_masks(rr_intervals)
+        recording_cache.put(key, masks, sum(mask.nbytes for mask in masks))
+    else:
+        logging.debug("Qualidade do sinal obtida do cache: %s", file_path)
+
+    return quality_from_masks(*masks, start=start)
+
+
 def interpolate_nan_values(
     rr_intervals,
     interpolation_method="linear",
@@ -229,26 +278,30 @@ def get_nn_intervals(rr_intervals, low_rri=LOW_RRI, high_rri=HIGH_RRI):
     return nn_intervals
 
 
-def truncate_rr_intervals(rr_intervals, target_duration, policy=POLICY):
+def truncate_rr_intervals(
+    rr_intervals, target_duration, policy=POLICY, time_index=None
+):
     """
     Corta os intervalos RR para garantir que todos tenham a mesma duração.
+    O ponto de corte é localizado por busca binária no índice de tempo.
     """
     logging.debug("Iniciando truncamento do sinal")
 
-    accumulated_time = 0.0
-    truncated_rr = []
+    if time_index is None:
+        time_index = TimeIndex.from_rr_intervals(rr_intervals)
 
-    for rr in rr_intervals:
-        if accumulated_time > target_duration:
-            break
-        truncated_rr.append(rr)
-        accumulated_time += rr
+    stop, accumulated_time = time_index.truncate(target_duration)
+    truncated_rr = rr_intervals[:stop]
 
     logging.debug(
-        f"Tamanho inicial: {len(rr_intervals)}, tamanho após truncamento: {len(truncated_rr)}"
+        "Tamanho inicial: %d, tamanho após truncamento: %d",
+        len(rr_intervals),
+        len(truncated_rr),
     )
     logging.debug(
-        f"Tempo acumulado após truncamento: {accumulated_time:.2f} s (limite: {target_duration:.2f} s)"
+        "Tempo acumulado após truncamento: %.2f s (limite: %.2f s)",
+        accumulated_time,
+        target_duration,
     )
 
-    return np.array(truncated_rr), accumulated_time
+    return np.asarray(truncated_rr), accumulated_time
@@ -2,9 +2,9 @@ import os
 import numpy as np
 import logging
 from config import QUALITY_THRESHOLD
-from processing import evaluate_signal_quality
 from utils import list_rr_files
-from file_io import load_rr_intervals
+from file_io import load_rr_intervals, load_time_index
+from processing import get_signal_quality
 
 
 def evaluate_directory_statistics(directory):
@@ -26,14 +26,15 @@ def evaluate_directory_statistics(directory):
 
         # Lê os valores dos intervalos RR
         rr_intervals = load_rr_intervals(file)
-        duration = np.sum(rr_intervals)  # Soma total em segundos
-        quality = evaluate_signal_quality(rr_intervals)
+        # Duração total em segundos, lida do índice de tempo quando disponível
+        duration = load_time_index(file, rr_intervals).duration
+        quality = get_signal_quality(file, rr_intervals)
 
         # Armazenando as informações dentro de files_stats usando o nome do arquivo como chave
         files_stats[file] = {"duration": duration, "quality": quality}
 
     if num_files == 0:
-        logging.warning(f"Nenhum arquivo encontrado em {directory}")
+        logging.warning("Nenhum arquivo encontrado em %s", directory)
         return None, None
 
     # Estatísticas básicas
@@ -123,7 +124,7 @@ def generate_statistics_report(control_dir, test_dir, output_file):
         f.write(control_section + "\n\n")
         f.write(test_section + "\n")
 
-    logging.info(f"Relatório salvo em: {output_file}")
+    logging.info("Relatório salvo em: %s", output_file)
 
     return report, control_file_stats, test_file_stats
 
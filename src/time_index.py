@@ -0,0 +1,84 @@
+import os
+import numpy as np
+
+
+class TimeIndex:
+    """
+    Índice de tempo acumulado de uma gravação de intervalos RR.
+
+    Armazena as fronteiras dos batimentos (0, rr0, rr0 + rr1, ...), de modo
+    que a duração total é obtida em O(1) e a extração de segmentos por tempo
+    em O(log n), por busca binária.
+    """
+
+    def __init__(self, boundaries):
+        self.boundaries = np.asarray(boundaries, dtype=float)
+
+    @classmethod
+    def from_rr_intervals(cls, rr_intervals):
+        """Constroi o índice a partir dos intervalos RR (em segundos)."""
+        boundaries = np.empty(len(rr_intervals) + 1)
+        boundaries[0] = 0.0
+        np.cumsum(rr_intervals, dtype=float, out=boundaries[1:])
+        return cls(boundaries)
+
+    def __len__(self):
+        return len(self.boundaries) - 1
+
+    @property
+    def duration(self):
+        """Duração total da gravação em segundos."""
+        return self.boundaries[-1]
+
+    def slice(self, t0, t1):
+        """
+        Retorna o slice dos batimentos contidos integralmente em [t0, t1].
+
+        Args:
+            t0 (float): Início do segmento em segundos.
+            t1 (float): Fim do segmento em segundos.
+
+        Returns:
+            slice: Índices dos batimentos do segmento.
+        """
+        start = np.searchsorted(self.boundaries, t0, side="left")
+        stop = np.searchsorted(self.boundaries, t1, side="right") - 1
+        return slice(int(start), int(max(start, stop)))
+
+    def windows(self, window_length, step=None):
+        """
+        Divide a gravação em janelas de duração fixa.
+
+        Args:
+            window_length (float): Duração de cada janela em segundos.
+            step (float): Deslocamento entre janelas (padrão: sem sobreposição).
+
+        Returns:
+            list: Slices dos batimentos de cada janela.
+        """
+        step = window_length if step is None else step
+        if self.duration < window_length:
+            return []
+
+        n_windows = int((self.duration - window_length) // step) + 1
+        return [
+            self.slice(t0, t0 + window_length) for t0 in np.arange(n_windows) * step
+        ]
+
+    def truncate(self, target_duration):
+        """
+        Localiza o ponto de truncamento: mantém os batimentos iniciados até
+        `target_duration`, incluindo o que ultrapassa o limite.
+
+        Returns:
+            tuple: (quantidade de batimentos mantidos, tempo acumulado).
+        """
+        stop = int(
+            np.searchsorted(self.boundaries[:-1], target_duration, side="right")
+        )
+        return stop, self.boundaries[stop]
+
+
+def get_index_path(file_path):
+    """Retorna o caminho do índice de tempo associado a um arquivo de RRi."""
+    return os.path.splitext(file_path)[0] + "_index.npy"
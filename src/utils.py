@@ -11,7 +11,7 @@ def list_rr_files(directory):
             if f.endswith(".txt")
         ]
     )
-    logging.info(f"{len(files)} arquivo(s) encontrado(s) em {directory}")
+    logging.info("%d arquivo(s) encontrado(s) em %s", len(files), directory)
     return files
 
 